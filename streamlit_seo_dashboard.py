@@ -4,14 +4,22 @@
 import streamlit as st
 from google.oauth2 import service_account
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from google.api_core.exceptions import InvalidArgument
-from google.auth.transport.requests import Request as GAuthRequest
-from datetime import datetime, date, timedelta
-from dateutil.relativedelta import relativedelta
-import pandas as pd
+from google.analytics.data_v1beta.types import BatchRunReportsRequest, DateRange, Dimension, Metric, OrderBy, RunReportRequest
+from google.auth.transport.requests import AuthorizedSession
+from google.api_core.exceptions import GoogleAPIError, GoogleAPICallError, InvalidArgument, RetryError
+from google.auth.exceptions import GoogleAuthError, TransportError
+from requests.exceptions import ConnectionError as HTTPConnectionError, HTTPError, RequestException, Timeout
+from urllib.parse import quote
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+import threading
+from pathlib import Path
 import time
+from types import SimpleNamespace
+from collections import OrderedDict, defaultdict
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import pandas as pd
+import orjson
 
 # =========================
 # PAGE CONFIGURATION & CUSTOM STYLES
@@ -21,159 +29,428 @@ st.set_page_config(
     layout='wide'
 )
 
-st.markdown("""
-<style>
-  body { font-family: Arial, sans-serif; background-color: #ffffff; }
-  /* Metric circles layout */
-  .metric-row {
-    display: flex;
-    justify-content: space-around;
-    align-items: center;
-    margin: 2rem 0;
-  }
-  .metric-circle {
-    width: 160px;
-    height: 160px;
-    border-radius: 50%;
-    display: flex;
-    flex-direction: column;
-    justify-content: center;
-    align-items: center;
-    color: #ffffff;
-    margin: 0 1rem;
-  }
-  .metric-title {
-    font-size: 1.2rem;
-    font-weight: bold;
-    margin-bottom: 0.5rem;
-    text-align: center;
-  }
-  .metric-value {
-    font-size: 2rem;
-    font-weight: bold;
-  }
-  .metric-change {
-    margin-top: 0.5rem;
-    font-size: 1rem;
-  }
-  .bg-purple { background-color: #2d448d; }
-  .bg-blue   { background-color: #459fda; }
-  .bg-green  { background-color: #a6ce39; }
-  /* Styled-table definitions */
-  table.styled-table {
-    border-collapse: collapse;
-    width: 100%;
-    border-radius: 5px 5px 0 0;
-    overflow: hidden;
-    font-family: Arial, sans-serif;
-  }
-  table.styled-table thead tr {
-    background-color: #2d448d;
-    color: #ffffff;
-    text-transform: uppercase;
-    border-bottom: 4px solid #459fda;
-  }
-  table.styled-table th, table.styled-table td {
-    padding: 12px 15px;
-    color: #2d448d;
-  }
-  table.styled-table tbody tr:nth-of-type(even) { background-color: #f3f3f3; }
-  table.styled-table tbody tr:nth-of-type(odd)  { background-color: #ffffff; }
-  table.styled-table tbody tr:hover { background-color: #a6ce39 !important; }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_styles():
+    # Read styles.css once per process; it still has to be emitted on every rerun
+    return f"<style>{Path(__file__).with_name('styles.css').read_text()}</style>"
+
+# Style-only st.html goes to the event container: no markdown parse, no layout space
+st.html(load_styles())
 
 # =========================
 # AUTHENTICATION & CONFIG
 # =========================
 PROPERTY_ID   = '356205245'
+GA4_PROPERTY  = f'properties/{PROPERTY_ID}'
 SC_SITE_URL   = 'https://www.salasarservices.com/'
+SC_QUERY_URL  = 'https://searchconsole.googleapis.com/webmasters/v3/sites/{}/searchAnalytics/query'
 SCOPES        = [
     'https://www.googleapis.com/auth/analytics.readonly',
     'https://www.googleapis.com/auth/webmasters.readonly'
 ]
+# Per-process request limits. GA4's Data API quota is token-based per property and caps
+# concurrent requests at 10, so GA4 calls take a slot in a semaphore of that size; Search
+# Console's quota is 1200 queries per minute, paced with a token bucket.
+GA4_CONCURRENT = 10
+SC_QPS        = 1200 / 60
+# Per-call deadline for both APIs, well under the page's FETCH_TIMEOUT (60s) even for the
+# GA4 batch, which may be sent twice (the InvalidArgument retry). A hung upstream then
+# fails the call itself, so its worker is freed and the stale fallback gets a chance.
+API_TIMEOUT   = 20
+
+class TokenBucket:
+    # Holds up to `rate` tokens, refilled at `rate` per second; acquire() takes one and
+    # sleeps off any shortfall outside the lock. Shared by all sessions' worker threads.
+    def __init__(self, rate):
+        self.rate, self.tokens, self.last = rate, rate, time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            wait = max(0, 1 - self.tokens) / self.rate
+            self.tokens -= 1
+        if wait:
+            time.sleep(wait)
 
 @st.cache_resource
-def get_credentials():
-    sa = st.secrets['gcp']['service_account']
-    info = dict(sa)
-    pk = info.get('private_key', '').replace('\\n', '\n')
-    if not pk.endswith('\n'):
-        pk += '\n'
-    info['private_key'] = pk
+def get_clients():
+    # Credentials and API clients, built once per process and shared by every session.
+    # Fetchers look them up on a cache miss, so fully cached runs never touch secrets.
+    # Search Console goes over one pooled AuthorizedSession, so its calls reuse TLS connections.
+    # No eager token refresh: the transports fetch a token on first use and renew it on expiry.
+    info = dict(st.secrets['gcp']['service_account'])
+    info['private_key'] = info.get('private_key', '').replace('\\n', '\n').strip() + '\n'
     creds = service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
-    creds.refresh(GAuthRequest())
-    return creds
-
-creds = get_credentials()
-ga4   = BetaAnalyticsDataClient(credentials=creds)
-sc    = build('searchconsole', 'v1', credentials=creds)
+    return SimpleNamespace(
+        ga4=BetaAnalyticsDataClient(credentials=creds),
+        http=AuthorizedSession(creds),
+        ga4_slots=threading.BoundedSemaphore(GA4_CONCURRENT),
+        sc_limit=TokenBucket(SC_QPS),
+    )
 
 # =========================
 # HELPERS & DATA FETCH
 # =========================
 def pct_change(cur, prev):
-    return 0 if prev == 0 else (cur - prev) / prev * 100
+    # Vectorized over Series; a zero previous value has no defined change and yields NaN
+    return (cur - prev) / prev.where(prev != 0) * 100
+
 
+@st.cache_data(ttl=86400, show_spinner=False)
+def month_options(today):
+    # [date(2025,1,1), ...] month starts up to today; rebuilt once per day, not per rerun
+    return pd.date_range(date(2025,1,1), today, freq='MS').date.tolist()
 
 def date_ranges(month_sel=False):
+    # Read the clock once; every range (and so every cache key) derives from the same day
+    today = date.today()
     if month_sel:
-        months, today, d = [], date.today(), date(2025,1,1)
-        while d <= today:
-            months.append(d)
-            d += relativedelta(months=1)
-        sel = st.sidebar.selectbox('Select Month', [m.strftime('%B %Y') for m in months])
-        sd = datetime.strptime(sel, '%B %Y').date().replace(day=1)
-        ed = sd + relativedelta(months=1) - timedelta(days=1)
+        # Options stay dates; the label is display-only, so nothing is parsed back
+        sd = st.sidebar.selectbox('Select Month', month_options(today), format_func=lambda d: d.strftime('%B %Y'))
+        ed = (pd.Timestamp(sd) + pd.offsets.MonthEnd(0)).date()
     else:
-        ed = date.today()
+        ed = today
         sd = ed - timedelta(days=30)
     ped = sd - timedelta(days=1)
     psd = ped - (ed - sd)
-    fmt = lambda x: x.strftime('%Y-%m-%d')
-    return fmt(sd), fmt(ed), fmt(psd), fmt(ped)
-
-@st.cache_data(ttl=3600)
-def get_total_users(pid, sd, ed):
-    req = {'property': f'properties/{pid}', 'date_ranges': [{'start_date': sd, 'end_date': ed}], 'metrics': [{'name':'totalUsers'}]}
-    resp=ga4.run_report(request=req)
-    return int(resp.rows[0].metric_values[0].value)
-
-@st.cache_data(ttl=3600)
-def get_traffic(pid, sd, ed):
-    req={'property':f'properties/{pid}','date_ranges':[{'start_date':sd,'end_date':ed}],'dimensions':[{'name':'sessionDefaultChannelGroup'}],'metrics':[{'name':'sessions'}]}
-    resp=ga4.run_report(request=req)
-    return [{'channel':r.dimension_values[0].value,'sessions':int(r.metric_values[0].value)} for r in resp.rows]
-
-@st.cache_data(ttl=3600)
-def get_search_console(site, sd, ed):
-    body={'startDate':sd,'endDate':ed,'dimensions':['page','query'],'rowLimit':500}
-    resp=sc.searchanalytics().query(siteUrl=site, body=body).execute()
-    return resp.get('rows',[])
-
-@st.cache_data(ttl=3600)
-def get_active_users_by_country(pid, sd, ed, top_n=5):
-    req={'property':f'properties/{pid}','date_ranges':[{'start_date':sd,'end_date':ed}],'dimensions':[{'name':'country'}],'metrics':[{'name':'activeUsers'}],'order_bys':[{'metric':{'metric_name':'activeUsers'},'desc':True}],'limit':top_n}
-    resp=ga4.run_report(request=req)
-    return [{'country':r.dimension_values[0].value,'activeUsers':int(r.metric_values[0].value)} for r in resp.rows]
-
-@st.cache_data(ttl=3600)
-def fetch_ga4_pageviews(pid, sd, ed, top_n=10):
-    req={'property':f'properties/{pid}','date_ranges':[{'start_date':sd,'end_date':ed}],'dimensions':[{'name':'pageTitle'},{'name':'screenClass'}],'metrics':[{'name':'screenPageViews'}],'order_bys':[{'metric':{'metric_name':'screenPageViews'},'desc':True}],'limit':top_n}
+    # ISO strings double as the API date format and the fetchers' cache keys
+    return sd.isoformat(), ed.isoformat(), psd.isoformat(), ped.isoformat()
+
+def both_ranges(sd, ed, psd, ped):
+    # Current and previous period in one report; GA4 appends the range name as a trailing dateRange dimension
+    return [DateRange(start_date=sd, end_date=ed, name='current'), DateRange(start_date=psd, end_date=ped, name='previous')]
+
+def top_by(metric):
+    return [OrderBy(metric=OrderBy.MetricOrderBy(metric_name=metric), desc=True)]
+
+def users_request(sd, ed, psd, ped):
+    # No dimensions: GA4 returns the period totals directly, one row per range
+    return RunReportRequest(date_ranges=both_ranges(sd,ed,psd,ped), metrics=[Metric(name='totalUsers'), Metric(name='sessions')])
+
+def traffic_request(sd, ed):
+    # Current period only: the Sessions card's totals come from users_request
+    return RunReportRequest(date_ranges=[DateRange(start_date=sd, end_date=ed)], dimensions=[Dimension(name='sessionDefaultChannelGroup')], metrics=[Metric(name='sessions')])
+
+def country_request(sd, ed, top_n=5):
+    return RunReportRequest(date_ranges=[DateRange(start_date=sd, end_date=ed)], dimensions=[Dimension(name='country')], metrics=[Metric(name='activeUsers')], order_bys=top_by('activeUsers'), limit=top_n)
+
+def pageviews_request(sd, ed, dims, top_n=10):
+    return RunReportRequest(date_ranges=[DateRange(start_date=sd, end_date=ed)], dimensions=[Dimension(name=d) for d in dims], metrics=[Metric(name='screenPageViews')], order_bys=top_by('screenPageViews'), limit=top_n)
+
+def report_frame(report, dims, metric):
+    # One pass over the protobuf rows straight into records; the metric column is cast in bulk.
+    # Arrow-backed columns hand over to Streamlit's Arrow serializer without a copy.
+    records = ((*(v.value for v in r.dimension_values), r.metric_values[0].value) for r in report.rows)
+    df = pd.DataFrame.from_records(records, columns=[*dims, metric]).astype({metric: 'int64'})
+    return df.convert_dtypes(dtype_backend='pyarrow')
+
+# GA4 and Search Console keep revising a day's figures for a few days after it ends
+SETTLE_DAYS = 3
+# The in-memory tier's ttl only has to outlive the longest bucket (a day); superseded
+# 10-minute buckets age out through max_entries long before that and never touch disk
+LIVE_TTL = 86400
+
+def freshness(ed):
+    # Picks the cache tier below. A window settled for SETTLE_DAYS is 'closed': final, so it
+    # goes to the persisted tier for good. Anything newer goes to the in-memory tier under a
+    # bucket key: a recently closed window is refetched daily, one that includes today
+    # every 10 minutes.
+    now = datetime.now()
+    age = (now.date() - date.fromisoformat(ed)).days
+    if age > SETTLE_DAYS:
+        return 'closed'
+    if age > 0:
+        return now.strftime('%Y-%m-%d')
+    return now.strftime('%Y-%m-%d %H:') + str(now.minute // 10)
+
+def ga4_reports(prop, sd, ed, psd, ped):
+    # Every GA4 report on the page in one batchRunReports round-trip (API max is 5 per batch)
+    def run(page_dims):
+        reqs=[users_request(sd,ed,psd,ped), traffic_request(sd,ed), country_request(sd,ed), pageviews_request(sd,ed,page_dims)]
+        clients=get_clients()
+        with clients.ga4_slots:
+            return clients.ga4.batch_run_reports(request=BatchRunReportsRequest(property=prop, requests=reqs), timeout=API_TIMEOUT).reports
+    page_dims=['pageTitle','screenClass']
     try:
-        resp=ga4.run_report(request=req)
-        return [{'pageTitle':r.dimension_values[0].value,'screenClass':r.dimension_values[1].value,'views':int(r.metric_values[0].value)} for r in resp.rows]
+        reports=run(page_dims)
     except InvalidArgument:
-        req2={'property':f'properties/{pid}','date_ranges':[{'start_date':sd,'end_date':ed}],'dimensions':[{'name':'pagePath'}],'metrics':[{'name':'screenPageViews'}],'order_bys':[{'metric':{'metric_name':'screenPageViews'},'desc':True}],'limit':top_n}
-        resp2=ga4.run_report(request=req2)
-        return [{'pagePath':r.dimension_values[0].value,'views':int(r.metric_values[0].value)} for r in resp2.rows]
+        page_dims=['pagePath']
+        reports=run(page_dims)
+    users, traffic, countries, pageviews = reports
+    by_range={r.dimension_values[0].value: [int(v.value) for v in r.metric_values] for r in users.rows}
+    cur_users, cur_sessions = by_range.get('current', (0, 0))
+    prev_users, prev_sessions = by_range.get('previous', (0, 0))
+    return {
+        'users': cur_users,
+        'prev_users': prev_users,
+        'sessions': cur_sessions,
+        'prev_sessions': prev_sessions,
+        'traf': report_frame(traffic, ['channel'], 'sessions'),
+        'countries': report_frame(countries, ['country'], 'activeUsers'),
+        'pageviews': report_frame(pageviews, page_dims, 'views'),
+    }
+
+def sc_query(site, body):
+    # Plain REST call on the shared session; urllib3's pool is thread-safe, unlike httplib2
+    clients=get_clients()
+    clients.sc_limit.acquire()
+    # max_allowed_time also bounds the token refresh and the 401 retry, not just each read
+    resp=clients.http.post(SC_QUERY_URL.format(quote(site, safe='')), json=body, timeout=API_TIMEOUT, max_allowed_time=API_TIMEOUT)
+    resp.raise_for_status()
+    return orjson.loads(resp.content).get('rows',[])
+
+def search_console(site, sd, ed, row_limit=10):
+    # Only the rows the table shows; Search Console returns them ordered by clicks
+    rows=sc_query(site, {'startDate':sd,'endDate':ed,'dimensions':['page','query'],'rowLimit':row_limit})
+    df=pd.DataFrame.from_records(rows, columns=['keys','clicks'])
+    df=pd.DataFrame({'page':df['keys'].str[0],'query':df['keys'].str[1],'clicks':df['clicks'].fillna(0).astype('int64')})
+    return df.convert_dtypes(dtype_backend='pyarrow')
+
+def sc_clicks(site, sd, ed):
+    # No dimensions: Search Console answers with one aggregate row for the whole site
+    rows=sc_query(site, {'startDate':sd,'endDate':ed})
+    return int(rows[0]['clicks']) if rows else 0
+
+# Two cache tiers per fetcher. Settled ('closed') windows persist to disk, so a restarted
+# app starts warm; their data never changes, so each window writes one file, once. Open
+# windows stay in memory under their `fresh` bucket, where ttl and max_entries do evict:
+# a persisted cache only bounds its in-memory copy and never deletes superseded files.
+# Each entry carries the time it was fetched from Google, so hits keep the original stamp.
+def stamped(result):
+    return datetime.now(), result
+
+@st.cache_data(persist='disk', max_entries=64, show_spinner=False)
+def get_ga4_reports(prop, sd, ed, psd, ped):
+    return stamped(ga4_reports(prop, sd, ed, psd, ped))
+
+@st.cache_data(ttl=LIVE_TTL, max_entries=64, show_spinner=False)
+def get_ga4_reports_live(prop, sd, ed, psd, ped, fresh):
+    return stamped(ga4_reports(prop, sd, ed, psd, ped))
+
+@st.cache_data(persist='disk', max_entries=32, show_spinner=False)
+def get_search_console(site, sd, ed):
+    return stamped(search_console(site, sd, ed))
+
+@st.cache_data(ttl=LIVE_TTL, max_entries=32, show_spinner=False)
+def get_search_console_live(site, sd, ed, fresh):
+    return stamped(search_console(site, sd, ed))
+
+@st.cache_data(persist='disk', max_entries=64, show_spinner=False)
+def get_sc_clicks(site, sd, ed):
+    return stamped(sc_clicks(site, sd, ed))
+
+@st.cache_data(ttl=LIVE_TTL, max_entries=64, show_spinner=False)
+def get_sc_clicks_live(site, sd, ed, fresh):
+    return stamped(sc_clicks(site, sd, ed))
+
+# (settled, live) cache pair per fetcher; fetch() picks one from the window's freshness
+GA4_REPORTS = (get_ga4_reports, get_ga4_reports_live)
+SC_QUERIES  = (get_search_console, get_search_console_live)
+SC_CLICKS   = (get_sc_clicks, get_sc_clicks_live)
+
+# The pool is shared by every session, so it is sized for several concurrent page loads
+# (four fetches each) plus workers still held by runs a rerun interrupted
+FETCH_WORKERS = 16
+# Longest a run waits for its fetches before reporting the rest as timed out
+FETCH_TIMEOUT = 60
+
+@st.cache_resource
+def get_pool():
+    # One pool per process: module scope re-executes on every rerun
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+
+def submit(fn, *args):
+    # Pool threads outlive a rerun, so attach the current run's context on every call
+    ctx = get_script_run_ctx()
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+    return get_pool().submit(run)
+
+# Everything a fetch can raise for a Google-side reason: API answers, transport
+# failures on either client, and token fetches
+FETCH_ERRORS = (GoogleAPIError, RequestException, GoogleAuthError)
+
+def is_transient(e):
+    # Outages and throttling (connection failures, timeouts, 429, 5xx) justify a stale
+    # fallback; a 400/403 or bad credentials is a broken config and has to surface
+    if isinstance(e, (HTTPConnectionError, Timeout, TransportError, RetryError)):
+        return True
+    if isinstance(e, GoogleAuthError):
+        return e.retryable
+    if isinstance(e, HTTPError):
+        code = e.response.status_code if e.response is not None else None
+    elif isinstance(e, GoogleAPICallError):
+        code = e.code
+    else:
+        return False
+    return code is not None and (code == 429 or code >= 500)
+
+# Windows kept for the stale fallback; the rolling 30-day window adds new keys every day
+LAST_GOOD_MAX = 64
+
+@st.cache_resource
+def last_good():
+    # Last successful (fetched_at, result) of each fetch, keyed without its `fresh` argument,
+    # so a failed refresh can fall back to it. Shared by all sessions' workers, hence the lock.
+    return SimpleNamespace(entries=OrderedDict(), lock=threading.Lock())
+
+def remember(key, entry):
+    # Store as most recent and drop the least recently stored beyond LAST_GOOD_MAX
+    store = last_good()
+    with store.lock:
+        store.entries[key] = entry
+        store.entries.move_to_end(key)
+        if len(store.entries) > LAST_GOOD_MAX:
+            store.entries.popitem(last=False)
+
+def recall(key):
+    store = last_good()
+    with store.lock:
+        return store.entries.get(key)
+
+# Per-run fetch timings for the debug panel; module scope re-executes, so each rerun starts
+# empty. 'fast' (under FAST_FETCH_SECS) usually means a cache hit and 'slow' an API call,
+# but it is only a timing heuristic: a slow unpickle or a quick API answer can flip it.
+FAST_FETCH_SECS = 0.05
+fetch_stats = {}
+
+@st.cache_resource
+def generations():
+    # Per-call refresh counter shared by all sessions; bumping one makes every session's
+    # memo miss that call, since memo keys include it
+    return defaultdict(int)
+
+# Results already fetched by this session, by exact call (fresh key and generation
+# included). A rerun that repeats a call skips cache_data's hashing and unpickling.
+MEMO_MAX = 32
+
+def fetch(tiers, fresh, *args):
+    # Timed, fault-tolerant fetcher call through the cache tier `fresh` selects. Returns
+    # (result, saved_at), where saved_at is set only when a stale copy stood in.
+    settled, live = tiers
+    name = settled.__name__
+    key = (name, *args)
+    call = (name, fresh, generations()[key], *args)
+    memo = st.session_state['fetch_memo']
+    if call in memo:
+        fetch_stats[f'{name}({args[1]})'] = {'seconds': 0.0, 'timing': 'session'}
+        return memo[call], None
+    start = time.perf_counter()
+    try:
+        entry = settled(*args) if fresh == 'closed' else live(*args, fresh)
+    except FETCH_ERRORS as e:
+        entry = recall(key) if is_transient(e) else None
+        if entry is None:
+            raise
+        saved_at, result = entry
+    else:
+        remember(key, entry)
+        saved_at, result = None, entry[1]
+        if len(memo) >= MEMO_MAX:
+            memo.clear()
+        memo[call] = result
+    secs = time.perf_counter() - start
+    timing = 'stale' if saved_at else 'fast' if secs < FAST_FETCH_SECS else 'slow'
+    fetch_stats[f'{name}({args[1]})'] = {'seconds': round(secs, 3), 'timing': timing}
+    return result, saved_at
 
 # =========================
-# RENDER TABLE UTILITY
+# RENDER UTILITIES
 # =========================
-def render_table(df):
-    html=df.to_html(index=False,classes='styled-table')
-    st.markdown(html,unsafe_allow_html=True)
+def render_table(df, target=st):
+    # Arrow-backed virtualized grid: only visible rows reach the DOM. Full width, like the
+    # old width: 100% HTML tables; the grid has its own theme-coloured header and rows.
+    target.dataframe(df, width='stretch', hide_index=True)
+
+def render_metrics(target, ga, clicks, prev_clicks):
+    # One frame, one vectorized change computation
+    metrics = pd.DataFrame({
+        'title':    ['TOTAL USERS', 'SESSIONS', 'ORGANIC CLICKS'],
+        'bg':       ['bg-purple', 'bg-blue', 'bg-green'],
+        'current':  [ga['users'], ga['sessions'], clicks],
+        'previous': [ga['prev_users'], ga['prev_sessions'], prev_clicks],
+    }).astype({'current': 'int64', 'previous': 'int64'})
+    metrics['change'] = pct_change(metrics['current'], metrics['previous'])
+    circles = ''.join(f"""
+      <div class="metric-circle {m.bg}">
+        <div class="metric-title">{m.title}</div>
+        <div class="metric-value">{m.current}</div>
+        <div class="metric-change">{'n/a' if pd.isna(m.change) else f'{m.change:+.2f}%'}</div>
+      </div>""" for m in metrics.itertuples())
+    target.markdown(f'<div class="metric-row">{circles}\n</div>', unsafe_allow_html=True)
+
+# =========================
+# DASHBOARD SECTIONS
+# =========================
+# Which page slots each fetch feeds
+SLOTS = {
+    'ga':          ['metrics', 'countries', 'traf', 'pageviews'],
+    'sc':          ['sc'],
+    'clicks':      ['metrics'],
+    'prev_clicks': ['metrics'],
+}
+
+def website_calls(sd, ed, psd, ped):
+    # Every fetch of the Website Analytics section as (tiers, fresh, args), by result key
+    return {
+        'ga':          (GA4_REPORTS, freshness(ed),  (GA4_PROPERTY, sd, ed, psd, ped)),
+        'sc':          (SC_QUERIES,  freshness(ed),  (SC_SITE_URL, sd, ed)),
+        'clicks':      (SC_CLICKS,   freshness(ed),  (SC_SITE_URL, sd, ed)),
+        'prev_clicks': (SC_CLICKS,   freshness(ped), (SC_SITE_URL, psd, ped)),
+    }
+
+def refresh(calls):
+    # Drop just these calls from both cache tiers and bump their generation, so every
+    # session refetches them; other windows, sessions' other data and month_options stay
+    for (settled, live), fresh, args in calls.values():
+        settled.clear(*args)
+        live.clear(*args, fresh)
+        generations()[(settled.__name__, *args)] += 1
+
+def render_website_analytics(sd, ed, psd, ped):
+    st.header('Website Analytics')
+    # Dispatch every fetch first so the round-trips overlap
+    futs = {submit(fetch, tiers, fresh, *args): key for key, (tiers, fresh, args) in website_calls(sd, ed, psd, ped).items()}
+
+    # Lay out the page now; each slot is filled as soon as its data lands
+    slots = {'notice': st.empty(), 'metrics': st.empty()}
+    for key, title in [('countries', 'Active Users by Country (Top 5)'), ('traf', 'Traffic Acquisition by Channel'),
+                       ('sc', 'Top 10 Organic Queries'), ('pageviews', 'Page & Screen Views')]:
+        st.subheader(title)
+        slots[key] = st.empty()
+
+    data, stale, pending = {}, [], dict(futs)
+    try:
+        for fut in as_completed(futs, timeout=FETCH_TIMEOUT):
+            key = pending.pop(fut)
+            try:
+                data[key], saved_at = fut.result()
+            except FETCH_ERRORS as e:
+                for slot in SLOTS[key]:
+                    slots[slot].error(f'Not available: {e}')
+                continue
+            if saved_at:
+                stale.append(saved_at)
+                slots['notice'].warning(f'Google APIs are unreachable; showing last cached data from {min(stale):%Y-%m-%d %H:%M}.')
+            if key == 'ga':
+                for slot in ('countries', 'traf', 'pageviews'):
+                    render_table(data['ga'][slot], slots[slot])
+            elif key == 'sc':
+                render_table(data['sc'].nlargest(10, 'clicks'), slots['sc'])
+            if 'metrics' in SLOTS[key] and {'ga', 'clicks', 'prev_clicks'} <= data.keys():
+                render_metrics(slots['metrics'], data['ga'], data['clicks'], data['prev_clicks'])
+    except FuturesTimeoutError:
+        # Leave the stragglers to finish into the cache; the next rerun picks them up
+        for key in pending.values():
+            for slot in SLOTS[key]:
+                slots[slot].error(f'Not available: no response within {FETCH_TIMEOUT}s')
+
+def render_social_media():
+    st.header('Social Media Analytics (Coming Soon)')
 
 # =========================
 # SIDEBAR FILTERS
@@ -182,62 +459,28 @@ with st.sidebar:
     st.title('Filters')
     month_sel=st.checkbox('Select Month (vs last 30 days)')
     sd,ed,psd,ped=date_ranges(month_sel)
+    if st.button('Refresh data'):
+        refresh(website_calls(sd, ed, psd, ped))
+    # Created here on the script thread; the fetch workers only read and fill it
+    st.session_state.setdefault('fetch_memo', {})
+    st.title('Sections')
+    show_web=st.checkbox('Website Analytics', value=True)
+    show_social=st.checkbox('Social Media Analytics', value=True)
+    # Developer panel, opt-in with ?debug=timings so visitors never see it
+    stats_box=st.expander('Fetch timings') if st.query_params.get('debug') == 'timings' else None
 
 # =========================
 # DASHBOARD LAYOUT
 # =========================
 st.title('SEO & Reporting Dashboard')
 
-st.header('Website Analytics')
-# Compute metrics
-cur = get_total_users(PROPERTY_ID, sd, ed)
-prev = get_total_users(PROPERTY_ID, psd, ped)
-delta = pct_change(cur, prev)
-traf = get_traffic(PROPERTY_ID, sd, ed)
-total = sum(x['sessions'] for x in traf)
-prev_total = sum(x['sessions'] for x in get_traffic(PROPERTY_ID, psd, ped))
-delta2 = pct_change(total, prev_total)
-sc_data = get_search_console(SC_SITE_URL, sd, ed)
-clicks = sum(r.get('clicks',0) for r in sc_data)
-prev_clicks = sum(r.get('clicks',0) for r in get_search_console(SC_SITE_URL, psd, ped))
-delta3 = pct_change(clicks, prev_clicks)
-
-# Render metric circles
-st.markdown(f"""
-<div class="metric-row">
-  <div class="metric-circle bg-purple">
-    <div class="metric-title">TOTAL USERS</div>
-    <div class="metric-value">{cur}</div>
-    <div class="metric-change">{delta:.2f}%</div>
-  </div>
-  <div class="metric-circle bg-blue">
-    <div class="metric-title">SESSIONS</div>
-    <div class="metric-value">{total}</div>
-    <div class="metric-change">{delta2:.2f}%</div>
-  </div>
-  <div class="metric-circle bg-green">
-    <div class="metric-title">ORGANIC CLICKS</div>
-    <div class="metric-value">{clicks}</div>
-    <div class="metric-change">{delta3:.2f}%</div>
-  </div>
-</div>
-""", unsafe_allow_html=True)
-
-# Tables
-st.subheader('Active Users by Country (Top 5)')
-render_table(pd.DataFrame(get_active_users_by_country(PROPERTY_ID, sd, ed)))
-
-st.subheader('Traffic Acquisition by Channel')
-render_table(pd.DataFrame(get_traffic(PROPERTY_ID, sd, ed)))
-
-st.subheader('Top 10 Organic Queries')
-sc_df=pd.DataFrame([{'page':r['keys'][0],'query':r['keys'][1],'clicks':r.get('clicks',0)} for r in get_search_console(SC_SITE_URL, sd, ed)])
-render_table(sc_df.head(10))
-
-st.subheader('Page & Screen Views')
-try:
-    render_table(pd.DataFrame(fetch_ga4_pageviews(PROPERTY_ID, sd, ed)))
-except:
-    st.error('Views not available')
-
-st.header('Social Media Analytics (Coming Soon)')
+# Only the enabled sections run, so hiding one skips its fetches entirely
+if show_web:
+    render_website_analytics(sd, ed, psd, ped)
+if show_social:
+    render_social_media()
+
+# Filled last: every fetch of this run has finished by now
+if stats_box is not None:
+    stats_box.caption(f'Timing heuristic, not cache state: fast is under {FAST_FETCH_SECS * 1000:.0f} ms.')
+    stats_box.dataframe(pd.DataFrame.from_dict(fetch_stats, orient='index', columns=['seconds','timing']))